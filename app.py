@@ -1,5 +1,8 @@
 from datetime import datetime
-from models import Trade, Session
+from models import Trade, AlertRule, Ticker24h, Session
+from correlation import MAX_GRID_POINTS, correlation_cache
+from downsampling import AGGREGATIONS, MAX_POINTS, MAX_BUCKETS, parse_interval, bucket_prices, lttb
+from price_alerts import ALERT_CONDITIONS
 from flask import Flask, request, jsonify
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import desc, func, and_, exists
@@ -9,6 +12,10 @@ app = Flask(__name__)
 CURRENT_PRICE_ENDPOINT = '/current_price'
 HISTORICAL_DATA_ENDPOINT = '/historical_data'
 STATISTICAL_ANALYSIS_ENDPOINT = '/statistical_analysis'
+CORRELATION_MATRIX_ENDPOINT = '/correlation_matrix'
+ALERTS_ENDPOINT = '/alerts'
+TICKER_ENDPOINT = '/ticker_24h'
+TICKER_WINDOW = '24h'
 
 
 @app.route(CURRENT_PRICE_ENDPOINT, methods=['GET'])
@@ -48,10 +55,33 @@ def get_historical_data():
     end_date_str = request.args.get('end_date')
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=10, type=int)
+    interval_str = request.args.get('interval')
+    aggregation = request.args.get('aggregation', default='last')
+    max_points_str = request.args.get('max_points')
 
     if not symbol or not start_date_str or not end_date_str:
         return jsonify({'error': 'Please provide symbol, start_date, and end_date parameters'}), 400
 
+    interval_seconds = None
+    if interval_str:
+        try:
+            interval_seconds = parse_interval(interval_str)
+        except ValueError:
+            return jsonify({'error': 'Invalid interval, interval must be a positive number of seconds or end with '
+                                     's, m, h or d (e.g. 30s, 5m, 1h, 1d)'}), 400
+
+    if aggregation not in AGGREGATIONS:
+        return jsonify({'error': f"Invalid aggregation, aggregation must be one of {', '.join(AGGREGATIONS)}"}), 400
+
+    max_points = None
+    if max_points_str:
+        try:
+            max_points = int(max_points_str)
+        except ValueError:
+            max_points = 0
+        if not 3 <= max_points <= MAX_POINTS:
+            return jsonify({'error': f'max_points must be an integer between 3 and {MAX_POINTS}'}), 400
+
     try:
         start_date = datetime.strptime(start_date_str.replace('%20', ' '), '%Y-%m-%d %H:%M:%S')
         end_date = datetime.strptime(end_date_str.replace('%20', ' '), '%Y-%m-%d %H:%M:%S')
@@ -61,6 +91,13 @@ def get_historical_data():
     if start_date >= end_date:
         return jsonify({'error': 'Start date must be earlier than the end date'}), 400
 
+    if interval_seconds:
+        # Without max_points every bucket is returned, so the bucket count bounds the response size
+        max_buckets = MAX_BUCKETS if max_points else MAX_POINTS
+        if (end_date - start_date).total_seconds() / interval_seconds > max_buckets:
+            return jsonify({'error': f'Range is too long for the interval, at most {max_buckets} intervals are allowed '
+                                     f'per request; use a larger interval or set max_points'}), 400
+
     try:
         with Session() as session:
             symbol_exists = session.query(Trade).filter_by(symbol=symbol).first() is not None
@@ -78,6 +115,30 @@ def get_historical_data():
                                                                      Trade.timestamp >= start_date,
                                                                      Trade.timestamp <= end_date).scalar()
 
+            if interval_seconds or max_points:
+                # Single streaming pass in ascending order; the full range is returned without pagination
+                rows = session.query(Trade.timestamp, Trade.price).filter(
+                    Trade.symbol == symbol, Trade.timestamp >= start_date, Trade.timestamp <= end_date).order_by(
+                    Trade.timestamp, Trade.id).yield_per(1000)
+
+                value_key = 'price'
+                if interval_seconds:
+                    points = list(bucket_prices(rows, interval_seconds, aggregation))
+                    total_points = len(points)
+                    if aggregation == 'ohlc':
+                        value_key = 'close'
+                else:
+                    points = ({'timestamp': timestamp, 'price': price} for timestamp, price in rows)
+                    total_points = total_items
+
+                if max_points:
+                    points = lttb(points, total_points, max_points, value_key)
+
+                data = list(points)
+                return jsonify({'symbol': symbol, 'total_items': total_items, 'interval': interval_str,
+                                'aggregation': aggregation if interval_seconds else None,
+                                'max_points': max_points, 'total_points': len(data), 'data': data}), 200
+
             offset = (page - 1) * per_page
 
             trades = session.query(Trade).filter(Trade.symbol == symbol, Trade.timestamp >= start_date,
@@ -115,6 +176,13 @@ def perform_statistical_analysis():
 
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
+    window = request.args.get('window')
+
+    if window is not None:
+        if window.strip().lower() != TICKER_WINDOW:
+            return jsonify({'error': f'Invalid window, only window={TICKER_WINDOW} is supported'}), 400
+        if start_date_str or end_date_str:
+            return jsonify({'error': 'window cannot be combined with start_date and end_date'}), 400
 
     start_date = None
     end_date = None
@@ -131,6 +199,19 @@ def perform_statistical_analysis():
 
     try:
         with Session() as session:
+            if window is not None:
+                # Served from the rolling ticker maintained by the trade handler, without scanning trades
+                ticker = session.get(Ticker24h, symbol)
+                if ticker is None:
+                    return jsonify({'error': 'Ticker data not found for the specified symbol'}), 404
+
+                # The rolling sums cannot produce a median, so median_price is explicitly null in this mode
+                return jsonify({'symbol': symbol, 'window': TICKER_WINDOW, 'average_price': round(ticker.mean, 2),
+                                'median_price': None, 'standard_deviation': round(ticker.standard_deviation, 2),
+                                'percentage_change': round(ticker.change_percent, 2), 'open': ticker.open,
+                                'high': ticker.high, 'low': ticker.low, 'last': ticker.last,
+                                'trade_count': ticker.trade_count, 'updated_at': ticker.updated_at}), 200
+
             symbol_exists = session.query(Trade).filter_by(symbol=symbol).first() is not None
             if not symbol_exists:
                 return jsonify({'error': 'Symbol does not exist in the database'}), 404
@@ -169,5 +250,205 @@ def perform_statistical_analysis():
         return jsonify({'error': f'Error occurred while performing statistical analysis: {e}'}), 500
 
 
+@app.route(CORRELATION_MATRIX_ENDPOINT, methods=['GET'])
+def get_correlation_matrix():
+    symbols = request.args.get('symbol')
+    if not symbols or not symbols.strip():
+        return jsonify({'error': 'Please provide a valid symbol parameter'}), 400
+
+    symbols_list = []
+    for symbol in symbols.split(','):
+        symbol = symbol.strip()
+        if symbol and symbol not in symbols_list:
+            symbols_list.append(symbol)
+    if len(symbols_list) < 2:
+        return jsonify({'error': 'Please provide at least two comma separated symbols'}), 400
+
+    reference = request.args.get('reference', default=symbols_list[0]).strip()
+    if reference not in symbols_list:
+        return jsonify({'error': 'Reference symbol must be one of the requested symbols'}), 400
+
+    try:
+        interval_seconds = parse_interval(request.args.get('interval', default='1m'))
+        window_seconds = parse_interval(request.args.get('window', default='24h'))
+    except ValueError:
+        return jsonify({'error': 'Invalid interval or window, they must be a positive number of seconds or end with '
+                                 's, m, h or d (e.g. 30s, 5m, 1h, 1d)'}), 400
+
+    if window_seconds < 2 * interval_seconds:
+        return jsonify({'error': 'Window must span at least two intervals'}), 400
+
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    start_date = None
+    end_date = None
+
+    if start_date_str and end_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str.replace('%20', ' '), '%Y-%m-%d %H:%M:%S')
+            end_date = datetime.strptime(end_date_str.replace('%20', ' '), '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format, date format must be YYYY-MM-DD HH:MM:SS'}), 400
+
+        if start_date >= end_date:
+            return jsonify({'error': 'Start date must be earlier than the end date'}), 400
+
+        grid_points = (end_date - start_date).total_seconds() / interval_seconds
+    else:
+        grid_points = window_seconds / interval_seconds
+
+    if grid_points > MAX_GRID_POINTS:
+        return jsonify({'error': f'Range is too long for the interval, at most {MAX_GRID_POINTS} intervals are '
+                                 f'allowed per request'}), 400
+
+    try:
+        with Session() as session:
+            for symbol in symbols_list:
+                symbol_exists = session.query(Trade).filter_by(symbol=symbol).first() is not None
+                if not symbol_exists:
+                    return jsonify({'error': f'Symbol does not exist in the database: {symbol}'}), 404
+
+            if start_date and end_date:
+                result = correlation_cache.range_summary(session, symbols_list, reference, start_date, end_date,
+                                                         interval_seconds)
+            else:
+                result = correlation_cache.window_summary(session, symbols_list, reference, interval_seconds,
+                                                          window_seconds)
+
+            if result is None:
+                return jsonify({'error': 'Not enough overlapping data for the specified symbols and range'}), 404
+
+            result.update({'symbols': symbols_list, 'reference': reference, 'interval_seconds': interval_seconds})
+            return jsonify(result), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': f'Database error: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error occurred while computing correlation matrix: {e}'}), 500
+
+
+def alert_rule_to_dict(rule):
+    return {'id': rule.id, 'symbol': rule.symbol, 'condition': rule.condition, 'threshold': rule.threshold,
+            'window_seconds': rule.window_seconds, 'active': rule.active, 'created_at': rule.created_at,
+            'triggered_at': rule.triggered_at}
+
+
+@app.route(ALERTS_ENDPOINT, methods=['POST'])
+def create_alert_rule():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Please provide a JSON body with symbol, condition and threshold'}), 400
+
+    symbol = payload.get('symbol')
+    condition = payload.get('condition')
+    threshold = payload.get('threshold')
+    window = payload.get('window')
+
+    if not isinstance(symbol, str) or not symbol.strip():
+        return jsonify({'error': 'Please provide a valid symbol parameter'}), 400
+    symbol = symbol.strip()
+
+    if condition not in ALERT_CONDITIONS:
+        return jsonify({'error': f"Invalid condition, condition must be one of {', '.join(ALERT_CONDITIONS)}"}), 400
+
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or threshold <= 0:
+        return jsonify({'error': 'Threshold must be a positive number'}), 400
+
+    window_seconds = None
+    if condition == 'percent_move':
+        try:
+            window_seconds = parse_interval(str(window))
+        except ValueError:
+            return jsonify({'error': 'Please provide a valid window for percent_move alerts '
+                                     '(e.g. 30s, 5m, 1h, 1d)'}), 400
+
+    try:
+        with Session() as session:
+            symbol_exists = session.query(Trade).filter_by(symbol=symbol).first() is not None
+            if not symbol_exists:
+                return jsonify({'error': 'Symbol does not exist in the database'}), 404
+
+            rule = AlertRule(symbol=symbol, condition=condition, threshold=float(threshold),
+                             window_seconds=window_seconds)
+            session.add(rule)
+            session.commit()
+            return jsonify(alert_rule_to_dict(rule)), 201
+    except SQLAlchemyError as e:
+        return jsonify({'error': f'Database error: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error occurred while creating alert rule: {e}'}), 500
+
+
+@app.route(ALERTS_ENDPOINT, methods=['GET'])
+def get_alert_rules():
+    symbol = request.args.get('symbol')
+    active = request.args.get('active')
+
+    try:
+        with Session() as session:
+            query = session.query(AlertRule)
+            if symbol and symbol.strip():
+                query = query.filter(AlertRule.symbol == symbol.strip())
+            if active is not None:
+                query = query.filter(AlertRule.active.is_(active.lower() in ('1', 'true', 'yes')))
+
+            rules = query.order_by(AlertRule.id).all()
+            return jsonify({'total_items': len(rules), 'data': [alert_rule_to_dict(rule) for rule in rules]}), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': f'Database error: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error occurred while fetching alert rules: {e}'}), 500
+
+
+@app.route(f'{ALERTS_ENDPOINT}/<int:rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    try:
+        with Session() as session:
+            rule = session.get(AlertRule, rule_id)
+            if rule is None:
+                return jsonify({'error': 'Alert rule does not exist'}), 404
+
+            session.delete(rule)
+            session.commit()
+            return jsonify({'id': rule_id, 'deleted': True}), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': f'Database error: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error occurred while deleting alert rule: {e}'}), 500
+
+
+def ticker_to_dict(ticker):
+    return {'symbol': ticker.symbol, 'last': ticker.last, 'open': ticker.open, 'high': ticker.high,
+            'low': ticker.low, 'change_percent': ticker.change_percent, 'mean': ticker.mean,
+            'standard_deviation': ticker.standard_deviation, 'trade_count': ticker.trade_count,
+            'window_start': ticker.window_start, 'last_trade_at': ticker.last_trade_at,
+            'updated_at': ticker.updated_at}
+
+
+@app.route(TICKER_ENDPOINT, methods=['GET'])
+def get_ticker():
+    symbols = request.args.get('symbol')
+    if not symbols or not symbols.strip():
+        return jsonify({'error': 'Please provide a valid symbol parameter'}), 400
+
+    symbols_list = symbols.split(',')
+    if len(symbols_list) > 1:
+        return jsonify({'error': 'Only one symbol parameter is allowed'}), 400
+
+    symbol = symbols_list[0].strip()
+
+    try:
+        with Session() as session:
+            ticker = session.get(Ticker24h, symbol)
+            if ticker is None:
+                return jsonify({'error': 'Ticker data not found for the specified symbol'}), 404
+
+            return jsonify(ticker_to_dict(ticker)), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': f'Database error: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error occurred while fetching ticker: {e}'}), 500
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,272 @@
+import threading
+from array import array
+from collections import OrderedDict, deque
+from datetime import timedelta
+from models import Trade
+from sqlalchemy import desc, func
+from downsampling import EPOCH, epoch_seconds
+
+MAX_CACHED_RANGES = 128
+# Upper bound on return values (observations times symbols) held by all cached trailing windows together
+MAX_CACHED_RETURNS = 4000000
+# Upper bound on grid steps per request, since forward-filling walks every bucket in the range
+MAX_GRID_POINTS = 100000
+
+
+class ReturnsMatrix:
+    # Running sums of returns and their cross products, so observations can be added and removed in O(n^2)
+    def __init__(self, size):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.sums = [0.0] * self.size
+        self.cross = [[0.0] * self.size for _ in range(self.size)]
+
+    def add(self, returns, sign=1):
+        self.count += sign
+        for i in range(self.size):
+            self.sums[i] += sign * returns[i]
+            row = self.cross[i]
+            for j in range(i, self.size):
+                row[j] += sign * returns[i] * returns[j]
+
+    def remove(self, returns):
+        self.add(returns, sign=-1)
+
+    def covariance(self):
+        means = [total / self.count for total in self.sums]
+        matrix = [[0.0] * self.size for _ in range(self.size)]
+        for i in range(self.size):
+            for j in range(i, self.size):
+                matrix[i][j] = matrix[j][i] = self.cross[i][j] / self.count - means[i] * means[j]
+        return means, matrix
+
+    def summary(self, symbols, reference, requested=None):
+        # symbols gives the order the matrix was built in, requested the order results are reported in
+        means, covariance = self.covariance()
+        deviations = [max(covariance[i][i], 0.0) ** 0.5 for i in range(self.size)]
+        positions = {symbol: index for index, symbol in enumerate(symbols)}
+        order = [(symbol, positions[symbol]) for symbol in (requested or symbols)]
+        reference_index = positions[reference]
+        reference_variance = covariance[reference_index][reference_index]
+
+        correlation = {}
+        for symbol, i in order:
+            correlation[symbol] = {}
+            for other, j in order:
+                if deviations[i] and deviations[j]:
+                    correlation[symbol][other] = round(covariance[i][j] / (deviations[i] * deviations[j]), 6)
+                else:
+                    correlation[symbol][other] = None
+
+        return {
+            'observations': self.count,
+            'mean_return': {symbol: means[i] for symbol, i in order},
+            'covariance': {symbol: {other: covariance[i][j] for other, j in order} for symbol, i in order},
+            'correlation': correlation,
+            'beta': {symbol: round(covariance[i][reference_index] / reference_variance, 6)
+                     if reference_variance else None for symbol, i in order},
+        }
+
+
+def bucket_start(timestamp, interval_seconds):
+    return EPOCH + timedelta(seconds=int(epoch_seconds(timestamp) // interval_seconds) * interval_seconds)
+
+
+def align_prices(rows, symbols, interval_seconds, prices, start=None, until=None):
+    # rows are (timestamp, symbol, price) in ascending timestamp order. prices holds the forward-filled last price
+    # per symbol and is updated in place, so a caller can resume alignment later. Yields (bucket, prices) for every
+    # grid step from start once all symbols have a price, stopping before the bucket that starts at until.
+    interval = timedelta(seconds=interval_seconds)
+    positions = {symbol: index for index, symbol in enumerate(symbols)}
+    current = start
+
+    for timestamp, symbol, price in rows:
+        bucket = bucket_start(timestamp, interval_seconds)
+        if until is not None and bucket >= until:
+            break
+        # Until every symbol has a price nothing can be yielded, so jump straight to the next trade's bucket
+        if current is not None and bucket != current and None not in prices:
+            while current < bucket:
+                yield current, tuple(prices)
+                current += interval
+        current = bucket
+        prices[positions[symbol]] = price
+
+    if current is not None and None not in prices:
+        end = until if until is not None else current + interval
+        while current < end:
+            yield current, tuple(prices)
+            current += interval
+
+
+def price_returns(aligned):
+    previous = None
+    for bucket, prices in aligned:
+        if previous is not None:
+            yield bucket, [price / last - 1 for price, last in zip(prices, previous)]
+        previous = prices
+
+
+def prices_before(session, symbols, timestamp):
+    prices = []
+    for symbol in symbols:
+        trade = session.query(Trade.price).filter(Trade.symbol == symbol, Trade.timestamp < timestamp).order_by(
+            desc(Trade.timestamp), desc(Trade.id)).first()
+        prices.append(trade.price if trade else None)
+    return prices
+
+
+def query_trades(session, symbols, start, end=None):
+    query = session.query(Trade.timestamp, Trade.symbol, Trade.price).filter(Trade.symbol.in_(symbols),
+                                                                             Trade.timestamp >= start)
+    if end is not None:
+        query = query.filter(Trade.timestamp <= end)
+    return query.order_by(Trade.timestamp, Trade.id).yield_per(1000)
+
+
+def latest_timestamp(session, symbols):
+    return session.query(func.max(Trade.timestamp)).filter(Trade.symbol.in_(symbols)).scalar()
+
+
+class RecentWindow:
+    # Returns over the trailing window, extended with newly closed buckets and trimmed of expired ones per update
+    def __init__(self, symbols, interval_seconds, window_seconds):
+        self.symbols = symbols
+        self.interval_seconds = interval_seconds
+        self.window = timedelta(seconds=window_seconds)
+        # Most return values the window can hold, which the cache budgets against
+        self.capacity = (window_seconds // interval_seconds + 1) * len(symbols)
+        self.matrix = ReturnsMatrix(len(symbols))
+        self.returns = deque()
+        self.prices = None
+        self.previous = None
+        self.next_bucket = None
+        self.removed = 0
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.matrix.reset()
+        self.returns.clear()
+        self.prices = None
+        self.previous = None
+        self.next_bucket = None
+        self.removed = 0
+
+    def update(self, session):
+        latest = latest_timestamp(session, self.symbols)
+        if latest is None:
+            return
+
+        # The bucket holding the newest trade can still change, so only buckets before it are committed
+        open_bucket = bucket_start(latest, self.interval_seconds)
+        if self.next_bucket is not None and open_bucket - self.next_bucket > self.window:
+            # Everything held has expired, so start over rather than walk the whole gap
+            self.reset()
+        if self.next_bucket is None:
+            # Start one bucket early so the first bucket inside the window already has a return
+            self.next_bucket = bucket_start(latest - self.window, self.interval_seconds) - timedelta(
+                seconds=self.interval_seconds)
+            self.prices = prices_before(session, self.symbols, self.next_bucket)
+
+        if open_bucket > self.next_bucket:
+            rows = query_trades(session, self.symbols, self.next_bucket)
+            for bucket, prices in align_prices(rows, self.symbols, self.interval_seconds, self.prices,
+                                               self.next_bucket, open_bucket):
+                if self.previous is not None:
+                    returns = array('d', (price / last - 1 for price, last in zip(prices, self.previous)))
+                    self.returns.append((bucket, returns))
+                    self.matrix.add(returns)
+                self.previous = prices
+            self.next_bucket = open_bucket
+
+        window_start = self.next_bucket - self.window
+        while self.returns and self.returns[0][0] < window_start:
+            self.matrix.remove(self.returns.popleft()[1])
+            self.removed += 1
+
+        # Subtracting expired observations slowly accumulates rounding error, so rebuild once per window turnover
+        if self.removed > len(self.returns):
+            self.matrix.reset()
+            for _, returns in self.returns:
+                self.matrix.add(returns)
+            self.removed = 0
+
+    def summary(self, reference, requested=None):
+        if self.matrix.count < 2:
+            return None
+        result = self.matrix.summary(self.symbols, reference, requested)
+        result['start'] = self.returns[0][0]
+        result['end'] = self.next_bucket
+        return result
+
+
+class CorrelationCache:
+    def __init__(self, max_ranges=MAX_CACHED_RANGES, max_returns=MAX_CACHED_RETURNS):
+        self.max_ranges = max_ranges
+        self.max_returns = max_returns
+        self.ranges = OrderedDict()
+        self.windows = OrderedDict()
+        self.cached_returns = 0
+        # Only guards the cache dictionaries; database work happens outside it
+        self.lock = threading.Lock()
+
+    def range_summary(self, session, symbols, reference, start_date, end_date, interval_seconds):
+        # Cached per symbol set, so the same symbols requested in any order share one entry
+        requested = symbols
+        symbols = sorted(symbols)
+        key = (tuple(symbols), start_date, end_date, interval_seconds)
+        with self.lock:
+            matrix = self.ranges.get(key)
+            if matrix is not None:
+                self.ranges.move_to_end(key)
+
+        if matrix is None:
+            matrix = ReturnsMatrix(len(symbols))
+            prices = prices_before(session, symbols, start_date)
+            rows = query_trades(session, symbols, start_date, end_date)
+            until = bucket_start(end_date, interval_seconds) + timedelta(seconds=interval_seconds)
+            aligned = align_prices(rows, symbols, interval_seconds, prices, bucket_start(start_date, interval_seconds),
+                                   until)
+            for _, returns in price_returns(aligned):
+                matrix.add(returns)
+
+            # Ranges that reach past the newest trade can still gain data, so only settled ranges are cached
+            latest = latest_timestamp(session, symbols)
+            if latest is not None and end_date < latest:
+                with self.lock:
+                    self.ranges[key] = matrix
+                    if len(self.ranges) > self.max_ranges:
+                        self.ranges.popitem(last=False)
+
+        if matrix.count < 2:
+            return None
+        result = matrix.summary(symbols, reference, requested)
+        result['start'] = start_date
+        result['end'] = end_date
+        return result
+
+    def window_summary(self, session, symbols, reference, interval_seconds, window_seconds):
+        requested = symbols
+        symbols = sorted(symbols)
+        key = (tuple(symbols), interval_seconds, window_seconds)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = RecentWindow(symbols, interval_seconds, window_seconds)
+                self.cached_returns += window.capacity
+                # Evict least recently used windows until the held returns fit the budget, keeping the new one
+                while self.cached_returns > self.max_returns and len(self.windows) > 1:
+                    self.cached_returns -= self.windows.popitem(last=False)[1].capacity
+            else:
+                self.windows.move_to_end(key)
+
+        # Requests for other windows proceed while this one queries the database
+        with window.lock:
+            window.update(session)
+            return window.summary(reference, requested)
+
+
+correlation_cache = CorrelationCache()
@@ -1,12 +1,13 @@
 from utils import print_log
+from datetime import datetime
 from models import Trade, Session
 from sqlalchemy.exc import SQLAlchemyError
 
 
-def save_trade_data(symbol, price):
+def save_trade_data(symbol, price, timestamp=None):
     session = Session()
     try:
-        trade = Trade(symbol=symbol, price=price)
+        trade = Trade(symbol=symbol, price=price, timestamp=timestamp or datetime.now())
         session.add(trade)
         session.commit()
         print_log("Trade data saved successfully")
@@ -18,3 +19,19 @@ def save_trade_data(symbol, price):
         session.rollback()
     finally:
         session.close()
+
+
+def save_trades_data(trades):
+    session = Session()
+    try:
+        session.bulk_insert_mappings(Trade, trades)
+        session.commit()
+        print_log(f"{len(trades)} trades saved successfully")
+    except SQLAlchemyError as e:
+        print_log(f"Database error occurred: {e}", level='ERROR')
+        session.rollback()
+    except Exception as e:
+        print_log(f"Unexpected error occurred: {e}", level='ERROR')
+        session.rollback()
+    finally:
+        session.close()
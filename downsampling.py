@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+AGGREGATIONS = ('last', 'avg', 'ohlc')
+# Upper bound on points returned in one response
+MAX_POINTS = 10000
+# Upper bound on interval buckets held in memory when they are downsampled further with max_points
+MAX_BUCKETS = 100000
+
+
+def parse_interval(interval):
+    interval = interval.strip().lower()
+    if interval[-1:] in INTERVAL_UNITS:
+        seconds = int(interval[:-1]) * INTERVAL_UNITS[interval[-1]]
+    else:
+        seconds = int(interval)
+    if seconds <= 0:
+        raise ValueError(f"interval must be positive: {interval}")
+    return seconds
+
+
+def epoch_seconds(timestamp):
+    return (timestamp - EPOCH).total_seconds()
+
+
+def bucket_prices(rows, interval_seconds, aggregation='last'):
+    # rows are (timestamp, price) pairs in ascending timestamp order
+    bucket = None
+    for timestamp, price in rows:
+        bucket_start = EPOCH + timedelta(seconds=int(epoch_seconds(timestamp) // interval_seconds) * interval_seconds)
+        if bucket is None or bucket['timestamp'] != bucket_start:
+            if bucket is not None:
+                yield finish_bucket(bucket, aggregation)
+            bucket = {'timestamp': bucket_start, 'open': price, 'high': price, 'low': price, 'close': price,
+                      'sum': 0.0, 'count': 0}
+        bucket['high'] = max(bucket['high'], price)
+        bucket['low'] = min(bucket['low'], price)
+        bucket['close'] = price
+        bucket['sum'] += price
+        bucket['count'] += 1
+
+    if bucket is not None:
+        yield finish_bucket(bucket, aggregation)
+
+
+def finish_bucket(bucket, aggregation):
+    if aggregation == 'ohlc':
+        return {'timestamp': bucket['timestamp'], 'open': bucket['open'], 'high': bucket['high'],
+                'low': bucket['low'], 'close': bucket['close'], 'count': bucket['count']}
+    if aggregation == 'avg':
+        price = bucket['sum'] / bucket['count']
+    else:
+        price = bucket['close']
+    return {'timestamp': bucket['timestamp'], 'price': price, 'count': bucket['count']}
+
+
+def lttb(points, total, threshold, value_key='price'):
+    # Largest-Triangle-Three-Buckets over points in ascending timestamp order. Only the bucket being decided
+    # and the one after it are held in memory, so total must be known up front (e.g. from a COUNT query).
+    if threshold < 3 or total <= threshold:
+        yield from points
+        return
+
+    every = (total - 2) / (threshold - 2)
+    iterator = iter(points)
+    selected = next(iterator, None)
+    if selected is None:
+        return
+    yield selected
+
+    pending = []
+    current = []
+    current_index = 0
+    bucket_end = int(every) + 1
+    previous = None
+    for index, point in enumerate(iterator, start=1):
+        # Hold each point back by one step so the final point never lands in a bucket
+        if previous is not None:
+            if index - 1 >= bucket_end and current_index < threshold - 3:
+                pending.append(current)
+                current = []
+                current_index += 1
+                bucket_end = int((current_index + 1) * every) + 1
+                if len(pending) == 2:
+                    selected = select_point(selected, pending.pop(0), average_point(pending[0], value_key),
+                                            value_key)
+                    yield selected
+            current.append(previous)
+        previous = point
+
+    if current:
+        pending.append(current)
+    while pending:
+        bucket = pending.pop(0)
+        if pending:
+            next_average = average_point(pending[0], value_key)
+        else:
+            next_average = (epoch_seconds(previous['timestamp']), previous[value_key])
+        selected = select_point(selected, bucket, next_average, value_key)
+        yield selected
+
+    if previous is not None:
+        yield previous
+
+
+def average_point(bucket, value_key):
+    x = sum(epoch_seconds(point['timestamp']) for point in bucket) / len(bucket)
+    y = sum(point[value_key] for point in bucket) / len(bucket)
+    return x, y
+
+
+def select_point(anchor, bucket, next_average, value_key):
+    ax = epoch_seconds(anchor['timestamp'])
+    ay = anchor[value_key]
+    cx, cy = next_average
+    best_point = bucket[0]
+    best_area = -1.0
+    for point in bucket:
+        bx = epoch_seconds(point['timestamp'])
+        by = point[value_key]
+        area = abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+        if area > best_area:
+            best_area = area
+            best_point = point
+    return best_point
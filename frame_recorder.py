@@ -0,0 +1,85 @@
+import os
+import glob
+import gzip
+import json
+import time
+from utils import print_log
+
+SEGMENT_PREFIX = 'frames-'
+SEGMENT_SUFFIX = '.jsonl.gz'
+
+
+class FrameRecorder:
+    def __init__(self, directory, max_segment_frames=100000, max_segment_seconds=3600):
+        self.directory = directory
+        self.max_segment_frames = max_segment_frames
+        self.max_segment_seconds = max_segment_seconds
+        self.segment = None
+        self.segment_path = None
+        self.segment_frames = 0
+        self.segment_opened_at = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, data, received_at=None):
+        if received_at is None:
+            received_at = time.time()
+
+        if self.segment is None or self.should_rotate(received_at):
+            self.rotate(received_at)
+
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        self.segment.write(json.dumps({'received_at': received_at, 'data': data}) + '\n')
+        self.segment_frames += 1
+
+    def should_rotate(self, now):
+        return (self.segment_frames >= self.max_segment_frames or
+                now - self.segment_opened_at >= self.max_segment_seconds)
+
+    def rotate(self, now):
+        self.close()
+        # Segment names sort lexically in recording order, which replay relies on. Segments are opened exclusively
+        # so an existing one is never truncated; a rotation within the same millisecond gets a sequence suffix,
+        # which sorts after the unsuffixed name.
+        name = f"{SEGMENT_PREFIX}{int(now * 1000):015d}"
+        sequence = 0
+        while True:
+            suffix = f"_{sequence:06d}" if sequence else ''
+            self.segment_path = os.path.join(self.directory, f"{name}{suffix}{SEGMENT_SUFFIX}")
+            try:
+                self.segment = gzip.open(self.segment_path, 'xt', encoding='utf-8')
+                break
+            except FileExistsError:
+                sequence += 1
+        self.segment_frames = 0
+        self.segment_opened_at = now
+        print_log(f"Recording raw frames to {self.segment_path}")
+
+    def close(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def list_segments(directory):
+    return sorted(glob.glob(os.path.join(directory, f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")))
+
+
+def read_frames(directory):
+    for segment_path in list_segments(directory):
+        try:
+            with gzip.open(segment_path, 'rt', encoding='utf-8') as segment:
+                for line in segment:
+                    if not line.strip():
+                        continue
+                    frame = json.loads(line)
+                    yield frame['received_at'], frame['data']
+        except (EOFError, OSError, ValueError) as e:
+            # The newest segment can be truncated if the recorder was killed mid-write
+            print_log(f"Stopped reading segment {segment_path}: {e}", level='ERROR')
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from utils import print_log
+from price_alerts import alert_engine
+from frame_recorder import read_frames
+from data_manager import save_trades_data
+from websocket_trade_handler import get_trade_data, parse_trade_data
+
+
+async def replay_frames(directory, speed=1.0, check_alerts=False):
+    # speed=0 replays as fast as the ingest pipeline allows. Alerts are off by default so replaying old frames does
+    # not trigger live rules. The rolling ticker is never updated here: the trade handler owns tickers_24h and rebuilds
+    # it from the trades table when it starts.
+    if check_alerts:
+        # The replay runs in its own process, so the active rules have to be loaded before they can fire
+        alert_engine.sync()
+
+    frames = 0
+    started_at = time.monotonic()
+    first_received_at = None
+
+    for received_at, data in read_frames(directory):
+        if first_received_at is None:
+            first_received_at = received_at
+
+        if speed > 0:
+            delay = (received_at - first_received_at) / speed - (time.monotonic() - started_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await get_trade_data(data, datetime.fromtimestamp(received_at), check_alerts, update_ticker=False)
+        frames += 1
+
+    elapsed = time.monotonic() - started_at
+    print_log(f"Replayed {frames} frames in {elapsed:.2f} seconds")
+    return frames
+
+
+def bulk_load_frames(directory, batch_size=10000):
+    trades = []
+    loaded = 0
+    skipped = 0
+    started_at = time.monotonic()
+
+    for received_at, data in read_frames(directory):
+        try:
+            symbol, price = parse_trade_data(data)
+        except (KeyError, ValueError, TypeError):
+            # Subscription acknowledgements and other non-trade frames
+            skipped += 1
+            continue
+
+        trades.append({'symbol': symbol, 'price': float(price), 'timestamp': datetime.fromtimestamp(received_at)})
+        if len(trades) >= batch_size:
+            save_trades_data(trades)
+            loaded += len(trades)
+            trades = []
+
+    if trades:
+        save_trades_data(trades)
+        loaded += len(trades)
+
+    elapsed = time.monotonic() - started_at
+    print_log(f"Bulk loaded {loaded} trades ({skipped} non-trade frames skipped) in {elapsed:.2f} seconds")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Binance frames through the ingest pipeline")
+    parser.add_argument('directory', help="Directory containing recorded frame segments")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Replay speed multiplier, e.g. 1 for real time, 10 for 10x, 0 for maximum speed")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Skip the per-trade pipeline and bulk insert trades in batches")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Trades per bulk insert")
+    parser.add_argument('--check-alerts', action='store_true', help="Evaluate price alert rules during replay")
+    args = parser.parse_args()
+
+    if args.speed < 0:
+        parser.error("--speed must not be negative")
+
+    if args.bulk:
+        bulk_load_frames(args.directory, args.batch_size)
+    else:
+        asyncio.run(replay_frames(args.directory, args.speed, args.check_alerts))
+
+
+if __name__ == "__main__":
+    main()
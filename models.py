@@ -1,7 +1,7 @@
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Index
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Index
 
 Base = declarative_base()
 
@@ -14,7 +14,36 @@ class Trade(Base):
     timestamp = Column(DateTime, default=datetime.now())
 
 
+class AlertRule(Base):
+    __tablename__ = 'alert_rules'
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String)
+    condition = Column(String)
+    threshold = Column(Float)
+    window_seconds = Column(Integer, nullable=True)
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.now)
+    triggered_at = Column(DateTime, nullable=True)
+
+
+class Ticker24h(Base):
+    __tablename__ = 'tickers_24h'
+    symbol = Column(String, primary_key=True)
+    last = Column(Float)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    change_percent = Column(Float)
+    mean = Column(Float)
+    standard_deviation = Column(Float)
+    trade_count = Column(Integer)
+    window_start = Column(DateTime)
+    last_trade_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
 trade_symbol_index = Index('trade_symbol_index', Trade.symbol)
+alert_rule_active_index = Index('alert_rule_active_index', AlertRule.active)
 
 engine = create_engine('sqlite:///binance_cryptocurrency_prices.db')
 Base.metadata.create_all(bind=engine)
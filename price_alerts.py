@@ -0,0 +1,196 @@
+import json
+import time
+import queue
+import bisect
+import threading
+import urllib.request
+from datetime import datetime
+from utils import print_log
+from models import AlertRule, Session
+from rolling_window import RollingExtremes
+from sqlalchemy.exc import SQLAlchemyError
+
+ALERT_CONDITIONS = ('above', 'below', 'percent_move')
+
+
+class ThresholdIndex:
+    # Rules kept sorted by threshold, so the rules crossed by a price are always a prefix or a suffix
+    def __init__(self, entries=()):
+        self.entries = sorted(entries)
+
+    def pop_at_most(self, value):
+        index = bisect.bisect_right(self.entries, (value, float('inf')))
+        fired = self.entries[:index]
+        del self.entries[:index]
+        return fired
+
+    def pop_at_least(self, value):
+        index = bisect.bisect_left(self.entries, (value, float('-inf')))
+        fired = self.entries[index:]
+        del self.entries[index:]
+        return fired
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SymbolAlerts:
+    def __init__(self, above, below, moves, rules):
+        self.above = above
+        self.below = below
+        # window_seconds -> (RollingExtremes, ThresholdIndex of percentages)
+        self.moves = moves
+        # rule_id -> (condition, threshold, window_seconds)
+        self.rules = rules
+
+
+class LogAlertSink:
+    def deliver(self, alert):
+        print_log(f"Alert {alert['rule_id']} triggered: {alert['symbol']} {alert['condition']} "
+                  f"{alert['threshold']} at price {alert['price']}", level='ALERT')
+
+
+class QueueAlertSink:
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def deliver(self, alert):
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            print_log(f"Alert queue full, dropping alert {alert['rule_id']}", level='ERROR')
+
+
+class WebhookAlertSink:
+    # Posts alerts from a background thread so a slow endpoint never blocks trade ingestion
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def deliver(self, alert):
+        self.queue.put(alert)
+
+    def run(self):
+        while True:
+            alert = self.queue.get()
+            body = json.dumps(alert, default=str).encode('utf-8')
+            webhook_request = urllib.request.Request(self.url, data=body, method='POST',
+                                                     headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(webhook_request, timeout=self.timeout):
+                    pass
+            except Exception as e:
+                print_log(f"Error delivering alert {alert['rule_id']} to webhook: {e}", level='ERROR')
+
+
+class AlertEngine:
+    def __init__(self, sink=None, sync_interval=5):
+        self.sink = sink or LogAlertSink()
+        self.sync_interval = sync_interval
+        self.symbols = {}
+        self.syncer = None
+
+    def start(self):
+        # Load rules once, then keep reloading them on a background thread so the ingest path never waits on it
+        self.sync()
+        if self.syncer is None:
+            self.syncer = threading.Thread(target=self.run, daemon=True)
+            self.syncer.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self.sync()
+
+    def sync(self):
+        # Rules are registered through the API process, so the active set is reloaded from the database
+        session = Session()
+        try:
+            rules = session.query(AlertRule.id, AlertRule.symbol, AlertRule.condition, AlertRule.threshold,
+                                  AlertRule.window_seconds).filter(AlertRule.active.is_(True)).all()
+        except SQLAlchemyError as e:
+            print_log(f"Database error occurred while loading alert rules: {e}", level='ERROR')
+            return
+        finally:
+            session.close()
+        self.symbols = self.build(rules)
+
+    def build(self, rules):
+        grouped = {}
+        for rule_id, symbol, condition, threshold, window_seconds in rules:
+            above, below, moves, details = grouped.setdefault(symbol, ([], [], {}, {}))
+            if condition == 'above':
+                above.append((threshold, rule_id))
+            elif condition == 'below':
+                below.append((threshold, rule_id))
+            elif condition == 'percent_move':
+                moves.setdefault(window_seconds, []).append((threshold, rule_id))
+            else:
+                continue
+            details[rule_id] = (condition, threshold, window_seconds)
+
+        symbols = {}
+        for symbol, (above, below, moves, details) in grouped.items():
+            previous = self.symbols.get(symbol)
+            move_indexes = {}
+            for window_seconds, entries in moves.items():
+                # Keep price history across reloads so existing windows stay warm
+                if previous is not None and window_seconds in previous.moves:
+                    extremes = previous.moves[window_seconds][0]
+                else:
+                    extremes = RollingExtremes(window_seconds)
+                move_indexes[window_seconds] = (extremes, ThresholdIndex(entries))
+            symbols[symbol] = SymbolAlerts(ThresholdIndex(above), ThresholdIndex(below), move_indexes, details)
+        return symbols
+
+    def check(self, symbol, price, timestamp=None):
+        alerts = self.symbols.get(symbol)
+        if alerts is None:
+            return []
+
+        timestamp = timestamp or datetime.now()
+        fired = alerts.above.pop_at_most(price) + alerts.below.pop_at_least(price)
+
+        for extremes, index in alerts.moves.values():
+            extremes.add(timestamp.timestamp(), price)
+            move = max(price / extremes.minimum() - 1, 1 - price / extremes.maximum()) * 100
+            fired += index.pop_at_most(move)
+
+        if fired:
+            fired = self.trigger(symbol, alerts, fired, price, timestamp)
+        return fired
+
+    def trigger(self, symbol, alerts, fired, price, timestamp):
+        # Only rules this call actually deactivates are delivered, which skips rules deleted through the API or
+        # already fired before the in-memory indexes caught up
+        delivered = []
+        session = Session()
+        try:
+            for threshold, rule_id in fired:
+                updated = session.query(AlertRule).filter(AlertRule.id == rule_id, AlertRule.active.is_(True)).update(
+                    {AlertRule.active: False, AlertRule.triggered_at: timestamp}, synchronize_session=False)
+                if updated:
+                    delivered.append((threshold, rule_id))
+            session.commit()
+        except SQLAlchemyError as e:
+            print_log(f"Database error occurred while deactivating alert rules: {e}", level='ERROR')
+            session.rollback()
+            return []
+        finally:
+            session.close()
+
+        for _, rule_id in delivered:
+            condition, threshold, window_seconds = alerts.rules[rule_id]
+            alert = {'rule_id': rule_id, 'symbol': symbol, 'condition': condition, 'threshold': threshold,
+                     'window_seconds': window_seconds, 'price': price, 'triggered_at': timestamp}
+            try:
+                self.sink.deliver(alert)
+            except Exception as e:
+                print_log(f"Error delivering alert {rule_id}: {e}", level='ERROR')
+        return delivered
+
+
+alert_engine = AlertEngine()
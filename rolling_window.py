@@ -0,0 +1,117 @@
+from collections import deque
+
+
+class RollingExtremes:
+    # Minimum and maximum price over a trailing time window using monotonic deques, O(1) amortized per update
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.minimums = deque()
+        self.maximums = deque()
+
+    def add(self, timestamp, price):
+        self.push(timestamp, price)
+        self.expire_before(timestamp - self.window_seconds)
+
+    def push(self, timestamp, price):
+        while self.minimums and self.minimums[-1][1] >= price:
+            self.minimums.pop()
+        self.minimums.append((timestamp, price))
+
+        while self.maximums and self.maximums[-1][1] <= price:
+            self.maximums.pop()
+        self.maximums.append((timestamp, price))
+
+    def expire_before(self, cutoff):
+        while self.minimums and self.minimums[0][0] < cutoff:
+            self.minimums.popleft()
+        while self.maximums and self.maximums[0][0] < cutoff:
+            self.maximums.popleft()
+
+    def minimum(self):
+        return self.minimums[0][1] if self.minimums else None
+
+    def maximum(self):
+        return self.maximums[0][1] if self.maximums else None
+
+
+class RollingStats:
+    # Trailing window statistics from per-bucket running sums plus RollingExtremes, O(1) amortized per update.
+    # Whole buckets expire at once, so the window covers between window_seconds and window_seconds + bucket_seconds.
+    def __init__(self, window_seconds=86400, bucket_seconds=60):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.buckets = deque()
+        self.extremes = RollingExtremes(window_seconds)
+        self.reference = None
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.expired = 0
+        self.last = None
+        self.last_timestamp = None
+
+    def add(self, timestamp, price):
+        if self.reference is None:
+            # Sums are kept relative to the first price to limit cancellation in the variance
+            self.reference = price
+
+        bucket_start = timestamp - timestamp % self.bucket_seconds
+        if not self.buckets or self.buckets[-1][0] < bucket_start:
+            # [bucket_start, count, sum, sum_squares, open]
+            self.buckets.append([bucket_start, 0, 0.0, 0.0, price])
+
+        bucket = self.buckets[-1]
+        delta = price - self.reference
+        bucket[1] += 1
+        bucket[2] += delta
+        bucket[3] += delta * delta
+        self.count += 1
+        self.sum += delta
+        self.sum_squares += delta * delta
+
+        self.extremes.push(timestamp, price)
+        self.last = price
+        self.last_timestamp = timestamp
+        self.expire(timestamp)
+
+    def expire(self, now):
+        # Returns whether any bucket left the window
+        dropped = 0
+        while self.buckets and self.buckets[0][0] + self.bucket_seconds <= now - self.window_seconds:
+            _, count, total, total_squares, _ = self.buckets.popleft()
+            self.count -= count
+            self.sum -= total
+            self.sum_squares -= total_squares
+            dropped += 1
+
+        # Subtracting expired buckets slowly accumulates rounding error, so rebuild once per window turnover
+        self.expired += dropped
+        if self.expired > len(self.buckets):
+            self.count = sum(bucket[1] for bucket in self.buckets)
+            self.sum = sum(bucket[2] for bucket in self.buckets)
+            self.sum_squares = sum(bucket[3] for bucket in self.buckets)
+            self.expired = 0
+
+        if self.buckets:
+            self.extremes.expire_before(self.buckets[0][0])
+        return dropped > 0
+
+    def snapshot(self):
+        if not self.count:
+            return None
+
+        mean = self.sum / self.count
+        variance = max(self.sum_squares / self.count - mean * mean, 0.0)
+        open_price = self.buckets[0][4]
+        return {
+            'last': self.last,
+            'open': open_price,
+            'high': self.extremes.maximum(),
+            'low': self.extremes.minimum(),
+            'change_percent': (self.last - open_price) / open_price * 100 if open_price else None,
+            'mean': self.reference + mean,
+            'standard_deviation': variance ** 0.5,
+            'trade_count': self.count,
+            'window_start': self.buckets[0][0],
+            'last_trade_at': self.last_timestamp,
+        }
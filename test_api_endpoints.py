@@ -1,8 +1,16 @@
+import asyncio
 import unittest
-from models import Trade
+from datetime import datetime, timedelta
+from models import Base, Trade
 from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ticker_stats import TickerEngine
+from price_alerts import AlertEngine, QueueAlertSink
+from websocket_trade_handler import expire_tickers
 from sqlalchemy.exc import SQLAlchemyError
-from app import app, CURRENT_PRICE_ENDPOINT, HISTORICAL_DATA_ENDPOINT, STATISTICAL_ANALYSIS_ENDPOINT
+from app import app, CURRENT_PRICE_ENDPOINT, HISTORICAL_DATA_ENDPOINT, STATISTICAL_ANALYSIS_ENDPOINT, \
+    CORRELATION_MATRIX_ENDPOINT, ALERTS_ENDPOINT, TICKER_ENDPOINT
 
 
 class TestAPIEndpoints(unittest.TestCase):
@@ -197,6 +205,51 @@ class TestAPIEndpoints(unittest.TestCase):
             self.assertEqual(response.status_code, 500)
             self.assertIn('error', response.json)
 
+    def test_interval_downsampling_historical_data(self):
+        response = self.app.get(
+            f'{HISTORICAL_DATA_ENDPOINT}?symbol=BTCUSDT&start_date=2024-05-08 12:00:00&end_date=2024-05-08 23:00:00'
+            f'&interval=1h&aggregation=ohlc')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(point['count'] for point in response.json['data']), response.json['total_items'])
+        for point in response.json['data']:
+            self.assertLessEqual(point['low'], min(point['open'], point['close']))
+            self.assertGreaterEqual(point['high'], max(point['open'], point['close']))
+
+    def test_max_points_downsampling_historical_data(self):
+        response = self.app.get(
+            f'{HISTORICAL_DATA_ENDPOINT}?symbol=BTCUSDT&start_date=2024-05-08 12:00:00&end_date=2024-05-08 23:00:00'
+            f'&max_points=50')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json['total_items'], 50)
+        self.assertEqual(response.json['total_points'], 50)
+        self.assertEqual(len(response.json['data']), 50)
+
+    def test_invalid_downsampling_parameters_historical_data(self):
+        base_url = (f'{HISTORICAL_DATA_ENDPOINT}?symbol=BTCUSDT&start_date=2024-05-08 12:00:00'
+                    f'&end_date=2024-05-08 23:00:00')
+        for params in ('&interval=abc', '&interval=0m', '&interval=1m&aggregation=median', '&max_points=2',
+                       '&max_points=many', '&max_points=10001'):
+            response = self.app.get(base_url + params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json)
+
+    def test_range_too_long_for_interval_historical_data(self):
+        # 11 hours of 1s buckets is only allowed when max_points bounds the response
+        base_url = (f'{HISTORICAL_DATA_ENDPOINT}?symbol=BTCUSDT&start_date=2024-05-08 12:00:00'
+                    f'&end_date=2024-05-08 23:00:00&interval=1s')
+        response = self.app.get(base_url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 10000 intervals', response.json['error'])
+
+        response = self.app.get(base_url + '&max_points=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(response.json['total_points'], 100)
+
+        response = self.app.get(f'{HISTORICAL_DATA_ENDPOINT}?symbol=BTCUSDT&start_date=2024-05-01 00:00:00'
+                                f'&end_date=2024-05-08 23:00:00&interval=1s&max_points=100')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 100000 intervals', response.json['error'])
+
     @patch('data_manager.Session')
     def test_successful_statistical_analysis(self, mock_session):
         mock_data = [
@@ -475,6 +528,210 @@ class TestAPIEndpoints(unittest.TestCase):
             self.assertEqual(response.status_code, 500)
             self.assertIn('error', response.json)
 
+    def test_successful_correlation_matrix(self):
+        response = self.app.get(
+            f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,ETHUSDT,XRPUSDT&reference=ETHUSDT&interval=1m'
+            f'&start_date=2024-05-08 12:00:00&end_date=2024-05-08 23:00:00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['symbols'], ['BTCUSDT', 'ETHUSDT', 'XRPUSDT'])
+        self.assertEqual(response.json['beta']['ETHUSDT'], 1.0)
+        for symbol in response.json['symbols']:
+            self.assertEqual(response.json['correlation'][symbol][symbol], 1.0)
+            for other in response.json['symbols']:
+                self.assertEqual(response.json['correlation'][symbol][other],
+                                 response.json['correlation'][other][symbol])
+
+    def test_range_too_long_for_interval_correlation_matrix(self):
+        response = self.app.get(
+            f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,ETHUSDT&interval=1s'
+            f'&start_date=2023-05-08 00:00:00&end_date=2024-05-08 00:00:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+        response = self.app.get(f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,ETHUSDT&interval=1s&window=7d')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+    def test_single_symbol_correlation_matrix(self):
+        response = self.app.get(f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,BTCUSDT')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+    def test_invalid_reference_correlation_matrix(self):
+        response = self.app.get(f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,ETHUSDT&reference=XRPUSDT')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+    def test_symbol_not_exist_correlation_matrix(self):
+        response = self.app.get(f'{CORRELATION_MATRIX_ENDPOINT}?symbol=BTCUSDT,UNKNOWN')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json)
+
+    def test_invalid_alert_rule(self):
+        payloads = [{'condition': 'above', 'threshold': 10},
+                    {'symbol': 'BTCUSDT', 'condition': 'cross', 'threshold': 10},
+                    {'symbol': 'BTCUSDT', 'condition': 'above', 'threshold': -1},
+                    {'symbol': 'BTCUSDT', 'condition': 'percent_move', 'threshold': 5}]
+        for payload in payloads:
+            response = self.app.post(ALERTS_ENDPOINT, json=payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json)
+
+    def test_symbol_not_exist_alert_rule(self):
+        response = self.app.post(ALERTS_ENDPOINT, json={'symbol': 'UNKNOWN', 'condition': 'above', 'threshold': 10})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json)
+
+    def test_symbol_not_exist_ticker(self):
+        response = self.app.get(f'{TICKER_ENDPOINT}?symbol=UNKNOWN')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json)
+
+        response = self.app.get(f'{STATISTICAL_ANALYSIS_ENDPOINT}?symbol=UNKNOWN&window=24h')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json)
+
+    def test_invalid_window_statistical_analysis(self):
+        response = self.app.get(f'{STATISTICAL_ANALYSIS_ENDPOINT}?symbol=VETUSDT&window=7d')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+        response = self.app.get(
+            f'{STATISTICAL_ANALYSIS_ENDPOINT}?symbol=VETUSDT&window=24h&start_date=2024-05-08 12:57:51'
+            f'&end_date=2024-05-08 13:10:12')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json)
+
+
+class TestAlertRules(unittest.TestCase):
+    # These tests write alert rules, so they run against an in-memory database rather than the tracked one
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)
+        with self.session() as session:
+            session.add(Trade(symbol='BTCUSDT', price=62175.99, timestamp=datetime(2024, 5, 8, 12, 0, 0)))
+            session.commit()
+
+        for target in ('app.Session', 'price_alerts.Session'):
+            patcher = patch(target, self.session)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.app = app.test_client()
+
+    def test_create_list_and_delete_alert_rule(self):
+        response = self.app.post(ALERTS_ENDPOINT, json={'symbol': 'BTCUSDT', 'condition': 'percent_move',
+                                                        'threshold': 2.5, 'window': '5m'})
+        self.assertEqual(response.status_code, 201)
+        rule_id = response.json['id']
+        self.assertEqual(response.json['window_seconds'], 300)
+        self.assertTrue(response.json['active'])
+
+        response = self.app.get(f'{ALERTS_ENDPOINT}?symbol=BTCUSDT')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(rule_id, [rule['id'] for rule in response.json['data']])
+
+        response = self.app.delete(f'{ALERTS_ENDPOINT}/{rule_id}')
+        self.assertEqual(response.status_code, 200)
+        response = self.app.delete(f'{ALERTS_ENDPOINT}/{rule_id}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_alert_rule_triggered_by_engine(self):
+        response = self.app.post(ALERTS_ENDPOINT, json={'symbol': 'BTCUSDT', 'condition': 'above', 'threshold': 1e9})
+        rule_id = response.json['id']
+        sink = QueueAlertSink()
+        engine = AlertEngine(sink)
+        engine.sync()
+        self.assertEqual(engine.check('BTCUSDT', 1e9 - 1), [])
+        self.assertEqual(engine.check('BTCUSDT', 1e9), [(1e9, rule_id)])
+        self.assertEqual(engine.check('BTCUSDT', 1e9 + 1), [])
+        self.assertEqual(sink.queue.get_nowait()['rule_id'], rule_id)
+
+        response = self.app.get(f'{ALERTS_ENDPOINT}?symbol=BTCUSDT&active=false')
+        self.assertIn(rule_id, [rule['id'] for rule in response.json['data']])
+
+    def test_deleted_alert_rule_not_delivered(self):
+        response = self.app.post(ALERTS_ENDPOINT, json={'symbol': 'BTCUSDT', 'condition': 'below', 'threshold': 1e-9})
+        rule_id = response.json['id']
+        sink = QueueAlertSink()
+        engine = AlertEngine(sink)
+        engine.sync()
+
+        # Deleted after the engine loaded it, so the rule is still in the in-memory index
+        self.app.delete(f'{ALERTS_ENDPOINT}/{rule_id}')
+        self.assertEqual(engine.check('BTCUSDT', 1e-10), [])
+        self.assertTrue(sink.queue.empty())
+
+
+class TestTicker24h(unittest.TestCase):
+    # These tests write tickers_24h rows, so they run against an in-memory database rather than the tracked one
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        for target in ('app.Session', 'ticker_stats.Session'):
+            patcher = patch(target, sessionmaker(bind=engine))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.app = app.test_client()
+
+    def test_successful_ticker(self):
+        engine = TickerEngine()
+        now = datetime.now()
+        # The first trade falls outside the 24h window once the last one arrives
+        for offset, price in ((25 * 3600, 50.0), (3 * 3600, 100.0), (2 * 3600, 120.0), (3600, 90.0), (0, 110.0)):
+            engine.add('TICKERTEST', price, now - timedelta(seconds=offset))
+        engine.flush()
+
+        response = self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['trade_count'], 4)
+        self.assertEqual(response.json['open'], 100.0)
+        self.assertEqual(response.json['high'], 120.0)
+        self.assertEqual(response.json['low'], 90.0)
+        self.assertEqual(response.json['last'], 110.0)
+        self.assertAlmostEqual(response.json['change_percent'], 10.0)
+        self.assertAlmostEqual(response.json['mean'], 105.0)
+
+        response = self.app.get(f'{STATISTICAL_ANALYSIS_ENDPOINT}?symbol=TICKERTEST&window=24h')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['average_price'], 105.0)
+        self.assertEqual(response.json['standard_deviation'], 11.18)
+        self.assertEqual(response.json['percentage_change'], 10.0)
+        self.assertIsNone(response.json['median_price'])
+
+    def test_ticker_expires_without_new_trades(self):
+        engine = TickerEngine()
+        now = datetime.now()
+        engine.add('TICKERTEST', 100.0, now - timedelta(hours=2))
+        engine.add('TICKERTEST', 120.0, now)
+        engine.flush(now)
+        self.assertEqual(self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST').json['trade_count'], 2)
+
+        # No trades arrive, but the older trade leaves the window
+        engine.flush(now + timedelta(hours=23))
+        response = self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST')
+        self.assertEqual(response.json['trade_count'], 1)
+        self.assertEqual(response.json['low'], 120.0)
+
+        engine.flush(now + timedelta(hours=25))
+        response = self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('TICKERTEST', engine.stats)
+
+    def test_ticker_expired_while_no_trades_arrive(self):
+        engine = TickerEngine()
+        now = datetime.now()
+        engine.add('TICKERTEST', 100.0, now - timedelta(hours=25))
+        engine.flush(now - timedelta(hours=2))
+        self.assertEqual(self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST').status_code, 200)
+
+        # The handler's periodic task expires the window against the current time without any new trade
+        with patch('websocket_trade_handler.ticker_engine', engine):
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(asyncio.wait_for(expire_tickers(0), timeout=0.1))
+        self.assertEqual(self.app.get(f'{TICKER_ENDPOINT}?symbol=TICKERTEST').status_code, 404)
+        self.assertNotIn('TICKERTEST', engine.stats)
+
 
 if __name__ == '__main__':
     unittest.main()
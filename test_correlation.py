@@ -0,0 +1,111 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Trade
+from correlation import CorrelationCache, RecentWindow, align_prices
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']
+
+
+class TestRecentWindow(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)
+
+        generator = random.Random(7)
+        prices = {'BTCUSDT': 62000.0, 'ETHUSDT': 3000.0, 'XRPUSDT': 0.5}
+        start = datetime(2024, 5, 8, 12, 0, 0)
+        self.trades = []
+        for index in range(3000):
+            symbol = generator.choice(SYMBOLS)
+            prices[symbol] *= 1 + generator.gauss(0, 0.001)
+            self.trades.append(Trade(symbol=symbol, price=prices[symbol],
+                                     timestamp=start + timedelta(seconds=index * 7)))
+
+    def test_incremental_updates_match_range_summary(self):
+        interval_seconds = 60
+        window_seconds = 3600
+        window = RecentWindow(SYMBOLS, interval_seconds, window_seconds)
+        inserted = 0
+        updates = 0
+
+        for count in range(400, len(self.trades) + 1, 163):
+            with self.session() as session:
+                session.add_all(self.trades[inserted:count])
+                session.commit()
+                inserted = count
+
+                window.update(session)
+                summary = window.summary('BTCUSDT')
+                if summary is None:
+                    continue
+                updates += 1
+
+                # The window covers the hour of buckets before the open bucket, anchored on the bucket before that
+                start_date = summary['end'] - timedelta(seconds=window_seconds + interval_seconds)
+                end_date = summary['end'] - timedelta(microseconds=1)
+                expected = CorrelationCache().range_summary(session, SYMBOLS, 'BTCUSDT', start_date, end_date,
+                                                            interval_seconds)
+
+                self.assertEqual(summary['observations'], expected['observations'])
+                for symbol in SYMBOLS:
+                    self.assertAlmostEqual(summary['beta'][symbol], expected['beta'][symbol], places=5)
+                    for other in SYMBOLS:
+                        self.assertAlmostEqual(summary['correlation'][symbol][other],
+                                               expected['correlation'][symbol][other], places=5)
+
+        # Enough updates for buckets to be added, expired and the sums rebuilt
+        self.assertGreater(updates, 10)
+        self.assertEqual(summary['observations'], window_seconds // interval_seconds)
+
+    def test_symbol_order_shares_cache_entries(self):
+        with self.session() as session:
+            session.add_all(self.trades)
+            session.commit()
+
+            cache = CorrelationCache()
+            start_date = datetime(2024, 5, 8, 12, 30, 0)
+            end_date = datetime(2024, 5, 8, 16, 0, 0)
+            forward = cache.range_summary(session, SYMBOLS, 'ETHUSDT', start_date, end_date, 60)
+            reverse = cache.range_summary(session, SYMBOLS[::-1], 'ETHUSDT', start_date, end_date, 60)
+            self.assertEqual(len(cache.ranges), 1)
+            self.assertEqual(list(forward['correlation']), SYMBOLS)
+            self.assertEqual(list(reverse['correlation']), SYMBOLS[::-1])
+            self.assertEqual(list(reverse['correlation']['XRPUSDT']), SYMBOLS[::-1])
+            for symbol in SYMBOLS:
+                self.assertEqual(forward['beta'][symbol], reverse['beta'][symbol])
+                for other in SYMBOLS:
+                    self.assertEqual(forward['covariance'][symbol][other], reverse['covariance'][symbol][other])
+
+            cache.window_summary(session, SYMBOLS, 'BTCUSDT', 60, 3600)
+            cache.window_summary(session, SYMBOLS[::-1], 'BTCUSDT', 60, 3600)
+            self.assertEqual(len(cache.windows), 1)
+
+    def test_cached_windows_stay_within_return_budget(self):
+        with self.session() as session:
+            session.add_all(self.trades)
+            session.commit()
+
+            # Each 1h window of 1m returns over three symbols may hold 61 * 3 values, so only two fit
+            cache = CorrelationCache(max_returns=400)
+            for window_seconds in (3600, 3660, 3720):
+                cache.window_summary(session, SYMBOLS, 'BTCUSDT', 60, window_seconds)
+            self.assertEqual([key[2] for key in cache.windows], [3660, 3720])
+            self.assertEqual(cache.cached_returns, sum(window.capacity for window in cache.windows.values()))
+            self.assertLessEqual(cache.cached_returns, 400)
+
+    def test_align_prices_skips_buckets_before_every_symbol_has_a_price(self):
+        start = datetime(2024, 1, 1)
+        rows = [(start + timedelta(days=365), 'BTCUSDT', 1.0),
+                (start + timedelta(days=365, seconds=2), 'ETHUSDT', 2.0),
+                (start + timedelta(days=365, seconds=3), 'BTCUSDT', 1.5)]
+        aligned = list(align_prices(iter(rows), ['BTCUSDT', 'ETHUSDT'], 1, [None, None], start))
+        self.assertEqual(aligned, [(start + timedelta(days=365, seconds=2), (1.0, 2.0)),
+                                   (start + timedelta(days=365, seconds=3), (1.5, 2.0))])
+
+
+if __name__ == '__main__':
+    unittest.main()
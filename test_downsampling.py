@@ -0,0 +1,98 @@
+import math
+import unittest
+from datetime import datetime, timedelta
+from downsampling import bucket_prices, lttb, parse_interval
+
+START = datetime(2024, 5, 8, 12, 0, 0)
+
+
+def series(values, step_seconds=1):
+    return [{'timestamp': START + timedelta(seconds=index * step_seconds), 'price': value}
+            for index, value in enumerate(values)]
+
+
+def reference_lttb(points, threshold):
+    # Textbook Largest-Triangle-Three-Buckets over an in-memory list
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    x = [(point['timestamp'] - START).total_seconds() for point in points]
+    y = [point['price'] for point in points]
+    every = (len(points) - 2) / (threshold - 2)
+    selected = [0]
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, len(points))
+        next_x = sum(x[end:next_end]) / (next_end - end)
+        next_y = sum(y[end:next_end]) / (next_end - end)
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((x[anchor] - next_x) * (y[index] - y[anchor]) - (x[anchor] - x[index]) * (next_y - y[anchor]))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        anchor = best
+    selected.append(len(points) - 1)
+    return [points[index] for index in selected]
+
+
+class TestBucketPrices(unittest.TestCase):
+    def setUp(self):
+        # Two trades in the first minute, one exactly on the next boundary and one just before the third
+        self.rows = [(START + timedelta(seconds=5), 10.0), (START + timedelta(seconds=59, microseconds=999999), 20.0),
+                     (START + timedelta(minutes=1), 30.0), (START + timedelta(minutes=2, seconds=-1), 15.0),
+                     (START + timedelta(minutes=5, seconds=30), 40.0)]
+
+    def test_bucket_boundaries(self):
+        buckets = list(bucket_prices(self.rows, 60))
+        self.assertEqual([bucket['timestamp'] for bucket in buckets],
+                         [START, START + timedelta(minutes=1), START + timedelta(minutes=5)])
+        self.assertEqual([bucket['count'] for bucket in buckets], [2, 2, 1])
+
+    def test_last_and_avg(self):
+        self.assertEqual([bucket['price'] for bucket in bucket_prices(self.rows, 60, 'last')], [20.0, 15.0, 40.0])
+        self.assertEqual([bucket['price'] for bucket in bucket_prices(self.rows, 60, 'avg')], [15.0, 22.5, 40.0])
+
+    def test_ohlc(self):
+        first = next(bucket_prices(self.rows, 120, 'ohlc'))
+        self.assertEqual(first, {'timestamp': START, 'open': 10.0, 'high': 30.0, 'low': 10.0, 'close': 15.0,
+                                 'count': 4})
+
+    def test_parse_interval(self):
+        self.assertEqual([parse_interval(value) for value in ('30s', '5m', '1h', '1d', '90')],
+                         [30, 300, 3600, 86400, 90])
+        for value in ('0m', '-5s', 'abc'):
+            with self.assertRaises(ValueError):
+                parse_interval(value)
+
+
+class TestLTTB(unittest.TestCase):
+    def setUp(self):
+        self.points = series([math.sin(index / 25) * 100 + index % 7 for index in range(1000)])
+
+    def test_first_and_last_points_are_kept(self):
+        sampled = list(lttb(iter(self.points), len(self.points), 50))
+        self.assertEqual(len(sampled), 50)
+        self.assertIs(sampled[0], self.points[0])
+        self.assertIs(sampled[-1], self.points[-1])
+
+    def test_spike_survives(self):
+        values = [100.0] * 1000
+        values[421] = 500.0
+        points = series(values)
+        sampled = list(lttb(iter(points), len(points), 20))
+        self.assertIn(points[421], sampled)
+
+    def test_matches_reference_implementation(self):
+        for threshold in (3, 4, 10, 99, 500, 999):
+            sampled = list(lttb(iter(self.points), len(self.points), threshold))
+            self.assertEqual(sampled, reference_lttb(self.points, threshold))
+
+    def test_short_series_passes_through(self):
+        points = series([1.0, 2.0, 3.0])
+        self.assertEqual(list(lttb(iter(points), len(points), 10)), points)
+
+
+if __name__ == '__main__':
+    unittest.main()
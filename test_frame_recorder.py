@@ -0,0 +1,179 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Trade, AlertRule, Ticker24h
+from data_manager import save_trade_data
+from price_alerts import alert_engine, QueueAlertSink
+from ticker_stats import ticker_engine
+from frame_replay import bulk_load_frames, replay_frames
+from frame_recorder import FrameRecorder, list_segments, read_frames
+
+
+def trade_frame(symbol, price):
+    return json.dumps({'e': 'trade', 's': symbol, 'p': price})
+
+
+class TestFrameRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rotation_by_frame_count(self):
+        with FrameRecorder(self.directory, max_segment_frames=2) as recorder:
+            for index in range(5):
+                recorder.write(trade_frame('BTCUSDT', str(index)), 1000 + index / 10)
+
+        self.assertEqual(len(list_segments(self.directory)), 3)
+
+    def test_rotation_by_age(self):
+        with FrameRecorder(self.directory, max_segment_seconds=60) as recorder:
+            for received_at in (1000, 1030, 1059, 1060, 1200):
+                recorder.write(trade_frame('BTCUSDT', '1'), received_at)
+
+        self.assertEqual([os.path.basename(path) for path in list_segments(self.directory)],
+                         ['frames-000000001000000.jsonl.gz', 'frames-000000001060000.jsonl.gz',
+                          'frames-000000001200000.jsonl.gz'])
+
+    def test_rotation_within_same_millisecond_keeps_earlier_segments(self):
+        with FrameRecorder(self.directory, max_segment_frames=1) as recorder:
+            for index in range(3):
+                recorder.write(trade_frame('BTCUSDT', str(index)), 1000.0001)
+
+        self.assertEqual([os.path.basename(path) for path in list_segments(self.directory)],
+                         ['frames-000000001000000.jsonl.gz', 'frames-000000001000000_000001.jsonl.gz',
+                          'frames-000000001000000_000002.jsonl.gz'])
+        self.assertEqual([json.loads(data)['p'] for _, data in read_frames(self.directory)], ['0', '1', '2'])
+
+    def test_read_frames_in_order_across_segments(self):
+        with FrameRecorder(self.directory, max_segment_frames=3) as recorder:
+            for index in range(10):
+                recorder.write(trade_frame('BTCUSDT', str(index)), 1000 + index)
+
+        frames = list(read_frames(self.directory))
+        self.assertEqual([received_at for received_at, _ in frames], [1000 + index for index in range(10)])
+        self.assertEqual([json.loads(data)['p'] for _, data in frames], [str(index) for index in range(10)])
+
+    def test_read_frames_recovers_from_truncated_last_segment(self):
+        with FrameRecorder(self.directory, max_segment_frames=200) as recorder:
+            for index in range(400):
+                recorder.write(trade_frame('BTCUSDT', str(index) * 20), 1000 + index)
+
+        last_segment = list_segments(self.directory)[-1]
+        with open(last_segment, 'rb') as segment:
+            content = segment.read()
+        with open(last_segment, 'wb') as segment:
+            segment.write(content[:len(content) // 2])
+
+        frames = list(read_frames(self.directory))
+        self.assertGreaterEqual(len(frames), 200)
+        self.assertLess(len(frames), 400)
+        self.assertEqual([received_at for received_at, _ in frames], [1000 + index for index in range(len(frames))])
+
+
+class TestFrameReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_bulk_load_skips_non_trade_frames_and_keeps_timestamps(self):
+        with FrameRecorder(self.directory) as recorder:
+            recorder.write(json.dumps({'result': None, 'id': 1}), 1715172000.0)
+            recorder.write(trade_frame('BTCUSDT', '62175.99'), 1715172001.5)
+            recorder.write(trade_frame('ETHUSDT', '3010.5'), 1715172002.0)
+
+        with patch('data_manager.Session', self.session):
+            self.assertEqual(bulk_load_frames(self.directory), 2)
+
+        with self.session() as session:
+            trades = session.query(Trade).order_by(Trade.id).all()
+            self.assertEqual([(trade.symbol, trade.price) for trade in trades],
+                             [('BTCUSDT', 62175.99), ('ETHUSDT', 3010.5)])
+            self.assertEqual([trade.timestamp for trade in trades],
+                             [datetime.fromtimestamp(1715172001.5), datetime.fromtimestamp(1715172002.0)])
+
+    def test_replay_leaves_live_ticker_and_alerts_alone_by_default(self):
+        with FrameRecorder(self.directory) as recorder:
+            recorder.write(trade_frame('BTCUSDT', '62175.99'), 1715172001.5)
+
+        with patch('websocket_trade_handler.save_trade_data') as save, \
+                patch('websocket_trade_handler.ticker_engine') as ticker, \
+                patch('websocket_trade_handler.alert_engine') as alerts, \
+                patch('frame_replay.alert_engine', alerts):
+            asyncio.run(replay_frames(self.directory, speed=0))
+            save.assert_called_once_with('BTCUSDT', '62175.99', datetime.fromtimestamp(1715172001.5))
+            ticker.update.assert_not_called()
+            alerts.check.assert_not_called()
+
+            asyncio.run(replay_frames(self.directory, speed=0, check_alerts=True))
+            ticker.update.assert_not_called()
+            alerts.check.assert_called_once_with('BTCUSDT', 62175.99, datetime.fromtimestamp(1715172001.5))
+
+    def test_replay_keeps_live_ticker_rows(self):
+        live = datetime.now()
+        with self.session() as session:
+            session.add(Ticker24h(symbol='BTCUSDT', last=65000.0, open=64000.0, high=65500.0, low=63900.0,
+                                  change_percent=1.5625, mean=64800.0, standard_deviation=300.0, trade_count=1000,
+                                  window_start=live, last_trade_at=live, updated_at=live))
+            session.commit()
+
+        # Frames older than the 24h window, which would empty a ticker that flushed against the current time
+        with FrameRecorder(self.directory) as recorder:
+            recorder.write(trade_frame('BTCUSDT', '62175.99'), 1715172001.5)
+
+        with patch('data_manager.Session', self.session), patch('ticker_stats.Session', self.session), \
+                patch.object(ticker_engine, 'stats', {}), patch.object(ticker_engine, 'dirty', set()):
+            asyncio.run(replay_frames(self.directory, speed=0))
+            self.assertEqual(ticker_engine.stats, {})
+
+        with self.session() as session:
+            ticker = session.get(Ticker24h, 'BTCUSDT')
+            self.assertEqual((ticker.last, ticker.trade_count, ticker.updated_at), (65000.0, 1000, live))
+
+    def test_replay_with_check_alerts_fires_rules(self):
+        with self.session() as session:
+            session.add(AlertRule(symbol='BTCUSDT', condition='above', threshold=120.0))
+            session.commit()
+
+        with FrameRecorder(self.directory) as recorder:
+            for received_at, price in ((1715172000.0, '110'), (1715172001.0, '150'), (1715172002.0, '200')):
+                recorder.write(trade_frame('BTCUSDT', price), received_at)
+
+        sink = QueueAlertSink()
+        with patch('data_manager.Session', self.session), patch('price_alerts.Session', self.session), \
+                patch.object(alert_engine, 'symbols', {}), patch.object(alert_engine, 'sink', sink):
+            asyncio.run(replay_frames(self.directory, speed=0, check_alerts=True))
+
+        alert = sink.queue.get_nowait()
+        self.assertEqual((alert['symbol'], alert['price']), ('BTCUSDT', 150.0))
+        self.assertTrue(sink.queue.empty())
+        with self.session() as session:
+            rule = session.query(AlertRule).one()
+            self.assertFalse(rule.active)
+            self.assertEqual(rule.triggered_at, datetime.fromtimestamp(1715172001.0))
+
+    def test_save_trade_data_stores_given_timestamp(self):
+        timestamp = datetime(2024, 5, 8, 12, 57, 51, 250000)
+        with patch('data_manager.Session', self.session):
+            save_trade_data('VETUSDT', 0.03498, timestamp)
+
+        with self.session() as session:
+            trade = session.query(Trade).one()
+            self.assertEqual(trade.timestamp, timestamp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+from datetime import datetime, timedelta
+from utils import print_log
+from models import Trade, Ticker24h, Session
+from rolling_window import RollingStats
+from sqlalchemy.exc import SQLAlchemyError
+
+TICKER_WINDOW_SECONDS = 86400
+
+
+class TickerEngine:
+    # Rolling 24h statistics per symbol, updated from the trade stream and periodically written to tickers_24h
+    def __init__(self, window_seconds=TICKER_WINDOW_SECONDS, bucket_seconds=60, flush_interval=1):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.stats = {}
+        self.dirty = set()
+        self.last_flushed = time.monotonic()
+
+    def load(self):
+        # Warm the windows from the trades table once at startup so tickers are complete immediately
+        session = Session()
+        try:
+            since = datetime.now() - timedelta(seconds=self.window_seconds)
+            rows = session.query(Trade.symbol, Trade.price, Trade.timestamp).filter(Trade.timestamp >= since).order_by(
+                Trade.timestamp, Trade.id).yield_per(1000)
+            for symbol, price, timestamp in rows:
+                self.add(symbol, price, timestamp)
+
+            # Rows left by an earlier run for symbols with no trades in the last 24h are no longer valid
+            session.query(Ticker24h).filter(Ticker24h.symbol.notin_(list(self.stats))).delete(
+                synchronize_session=False)
+            session.commit()
+            print_log(f"Loaded rolling ticker statistics for {len(self.stats)} symbols")
+        except SQLAlchemyError as e:
+            print_log(f"Database error occurred while loading ticker statistics: {e}", level='ERROR')
+            session.rollback()
+        finally:
+            session.close()
+        self.flush()
+
+    def add(self, symbol, price, timestamp=None):
+        stats = self.stats.get(symbol)
+        if stats is None:
+            stats = self.stats[symbol] = RollingStats(self.window_seconds, self.bucket_seconds)
+        stats.add((timestamp or datetime.now()).timestamp(), price)
+        self.dirty.add(symbol)
+
+    def update(self, symbol, price, timestamp=None):
+        self.add(symbol, price, timestamp)
+        if time.monotonic() - self.last_flushed >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self, symbol):
+        stats = self.stats.get(symbol)
+        return stats.snapshot() if stats is not None else None
+
+    def flush(self, now=None):
+        self.last_flushed = time.monotonic()
+        now = now or datetime.now()
+
+        # Symbols that stopped trading still need their old trades expired, or their rows would freeze
+        for symbol, stats in self.stats.items():
+            if stats.expire(now.timestamp()):
+                self.dirty.add(symbol)
+        if not self.dirty:
+            return
+
+        session = Session()
+        try:
+            emptied = []
+            for symbol in self.dirty:
+                snapshot = self.snapshot(symbol)
+                if snapshot is None:
+                    session.query(Ticker24h).filter_by(symbol=symbol).delete(synchronize_session=False)
+                    emptied.append(symbol)
+                    continue
+                session.merge(Ticker24h(symbol=symbol, last=snapshot['last'], open=snapshot['open'],
+                                        high=snapshot['high'], low=snapshot['low'],
+                                        change_percent=snapshot['change_percent'], mean=snapshot['mean'],
+                                        standard_deviation=snapshot['standard_deviation'],
+                                        trade_count=snapshot['trade_count'],
+                                        window_start=datetime.fromtimestamp(snapshot['window_start']),
+                                        last_trade_at=datetime.fromtimestamp(snapshot['last_trade_at']),
+                                        updated_at=now))
+            session.commit()
+            self.dirty.clear()
+            for symbol in emptied:
+                del self.stats[symbol]
+        except SQLAlchemyError as e:
+            print_log(f"Database error occurred while saving ticker statistics: {e}", level='ERROR')
+            session.rollback()
+        finally:
+            session.close()
+
+
+ticker_engine = TickerEngine()
@@ -1,13 +1,22 @@
 import json
+import time
 import asyncio
+import argparse
 import websockets
+from datetime import datetime
 from utils import print_log
+from frame_recorder import FrameRecorder
 from data_manager import save_trade_data
+from ticker_stats import ticker_engine
+from price_alerts import alert_engine, WebhookAlertSink
 
 
-async def binance_websocket_connection():
+async def binance_websocket_connection(recorder=None):
     print_log("Starting Binance WebSocket connection")
     retry_delay = min(2, 60)
+    alert_engine.start()
+    ticker_engine.load()
+    expiry = asyncio.create_task(expire_tickers(ticker_engine.bucket_seconds))
 
     while True:
         try:
@@ -16,8 +25,15 @@ async def binance_websocket_connection():
 
                 while True:
                     data = await websocket.recv()
+                    received_at = time.time()
+                    if recorder is not None:
+                        try:
+                            recorder.write(data, received_at)
+                        except Exception as e:
+                            # A recording problem such as a full disk must not tear down the live connection
+                            print_log(f"Error recording frame: {e}", level='ERROR')
                     await asyncio.sleep(1 / 5)
-                    await get_trade_data(data)
+                    await get_trade_data(data, datetime.fromtimestamp(received_at))
         except websockets.exceptions.ConnectionClosed:
             print_log("Connection to Binance closed. Retrying...", level='ERROR', delay=retry_delay)
             await asyncio.sleep(retry_delay)
@@ -27,9 +43,17 @@ async def binance_websocket_connection():
             print_log(f"Error occurred: {e}", level='ERROR')
             continue
 
+    expiry.cancel()
     print_log("Binance WebSocket connection ended")
 
 
+async def expire_tickers(interval):
+    # Trades drive most flushes, but while the connection is down or retrying old trades must still leave the window
+    while True:
+        await asyncio.sleep(interval)
+        ticker_engine.flush()
+
+
 async def subscribe_to_trades(websocket):
     subscription_msg = {
         "method": "SUBSCRIBE",
@@ -47,18 +71,44 @@ async def subscribe_to_trades(websocket):
     await websocket.send(json.dumps(subscription_msg))
 
 
-async def get_trade_data(data):
+def parse_trade_data(data):
+    trade_data = json.loads(data)
+    return trade_data['s'], trade_data['p']
+
+
+async def get_trade_data(data, timestamp=None, check_alerts=True, update_ticker=True):
     try:
-        trade_data = json.loads(data)
-        symbol = trade_data['s']
-        price = trade_data['p']
+        symbol, price = parse_trade_data(data)
         print_log(f"Symbol: {symbol}, Price: {price}")
-        save_trade_data(symbol, price)
+        save_trade_data(symbol, price, timestamp)
+        if update_ticker:
+            ticker_engine.update(symbol, float(price), timestamp)
+        if check_alerts:
+            alert_engine.check(symbol, float(price), timestamp)
     except KeyError as e:
         print_log(f"Error getting trade data: {e}", level='ERROR')
     except Exception as e:
         print_log(f"Error occurred: {e}", level='ERROR')
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Capture Binance trade prices into the database")
+    parser.add_argument('--record-dir', help="Also append every raw frame to compressed segments in this directory")
+    parser.add_argument('--segment-frames', type=int, default=100000, help="Rotate segments after this many frames")
+    parser.add_argument('--segment-seconds', type=int, default=3600, help="Rotate segments after this many seconds")
+    parser.add_argument('--alert-webhook',
+                        help="POST triggered price alerts as JSON to this URL instead of logging them")
+    args = parser.parse_args()
+
+    if args.alert_webhook:
+        alert_engine.sink = WebhookAlertSink(args.alert_webhook)
+
+    if args.record_dir:
+        with FrameRecorder(args.record_dir, args.segment_frames, args.segment_seconds) as recorder:
+            asyncio.run(binance_websocket_connection(recorder))
+    else:
+        asyncio.run(binance_websocket_connection())
+
+
 if __name__ == "__main__":
-    asyncio.run(binance_websocket_connection())
+    main()